@@ -1,21 +1,20 @@
 import streamlit as st
 import os
-import pandas as pd
+import numpy as np
 import json
+import csv
+import io
+import re
+import hashlib
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from io import BytesIO
 from dotenv import load_dotenv
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
+# langchain·Google SDK·reportlab 등 무거운 모듈은 첫 화면을 그린 뒤 필요한 곳에서 불러온다.
 
 # ====== 환경변수 불러오기 (선택사항) ======
 load_dotenv()
@@ -23,6 +22,16 @@ load_dotenv()
 # ====== 기본 설정 ======
 st.set_page_config(page_title="외국어 기사 학습 도우미", layout="wide")
 
+LLM_MODEL = "gemini-1.5-flash"
+CACHE_TTL_SECONDS = 86400  # 분석 결과 캐시 유지 시간 (24시간)
+URL_CACHE_TTL_SECONDS = 3600  # 같은 URL 재분석 시 크롤링을 건너뛰는 시간 (1시간)
+CACHE_MAX_ENTRIES = 256  # 캐시에 보관할 최대 항목 수 (초과 시 가장 오래 쓰지 않은 항목 삭제)
+MAX_URLS = 8  # 한 번에 분석할 수 있는 최대 기사 수
+CRAWL_CONCURRENCY = 4  # 동시에 요청할 최대 기사 수
+LLM_CONCURRENCY = 4  # 동시에 보낼 최대 Gemini 요청 수 (API 속도 제한 고려)
+MIN_ARTICLE_CHARS = 20  # 이보다 짧은(사실상 빈) 본문은 가져오기 실패로 보고 분석·캐시하지 않음 (짧은 CJK 기사도 통과하도록 낮게 설정)
+MAX_ARTICLE_CHARS = 12000  # LLM에 보낼 기사 본문 최대 길이 (입력 토큰·지연 시간 절감)
+
 # ====== 상단 헤더 (제목 + 커피 후원 버튼) ======
 col1, col2 = st.columns([3, 1])
 
@@ -78,9 +87,11 @@ if not api_key:
     st.stop()
 
 # ====== LLM 연결 (사용자 입력 API 키 사용) ======
+from langchain_google_genai import ChatGoogleGenerativeAI
+
 try:
     llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
+        model=LLM_MODEL,
         temperature=0,
         google_api_key=api_key
     )
@@ -90,109 +101,187 @@ except Exception as e:
     st.info("💡 API 키를 다시 확인해주세요.")
     st.stop()
 
+# ====== 분석 프롬프트 ======
+# 고정 지시문(규칙·JSON 형식)은 시스템 지시로 앞에 두고, 매번 바뀌는 기사 본문만 뒤에 붙인다.
+# (프롬프트 구조만 정리한 것으로, gemini-1.5-flash에서는 이 길이의 접두부에 캐시·요금 할인이 적용되지 않는다.)
+# 문장·번역과 단어장은 서로 독립적이라 두 프롬프트로 나눠 동시에 요청한다.
+ARTICLE_ONLY_RULE = (
+    "다음 텍스트에서 뉴스 기사 본문만 찾아서 분석해줘. "
+    "광고, 메뉴, 댓글, 관련기사 목록, 사이트 네비게이션 등은 무시하고 실제 뉴스 내용만 처리해줘.\n\n"
+)
+
+SENTENCES_RULES = ARTICLE_ONLY_RULE + (
+    "결과를 반드시 다음 JSON 형식으로만 출력해줘:\n"
+    "{{\n"
+    '  "topic": "기사 주제 (한국어 20자 이내)",\n'
+    '  "sentences": ["외국어 문장1", "외국어 문장2", "외국어 문장3", ...],\n'
+    '  "translations": ["한국어 번역1", "한국어 번역2", "한국어 번역3", ...]\n'
+    "}}\n\n"
+    
+    "중요한 규칙:\n"
+    "1. sentences와 translations는 반드시 같은 개수여야 함\n"
+    "2. sentences는 외국어 원문, translations는 한국어 번역\n"
+    "3. 배열 개수를 반드시 확인하고 정확히 맞춰서 출력"
+)
+
+VOCAB_RULES = ARTICLE_ONLY_RULE + (
+    "결과를 반드시 다음 JSON 형식으로만 출력해줘:\n"
+    "{{\n"
+    '  "words": ["외국어단어1", "외국어단어2", "외국어단어3", ...],\n'
+    '  "word_meanings": ["한국어뜻1", "한국어뜻2", "한국어뜻3", ...],\n'
+    '  "word_sentences": ["해당 단어가 나온 문장1", "해당 단어가 나온 문장2", "해당 단어가 나온 문장3", ...]\n'
+    "}}\n\n"
+    
+    "중요한 규칙:\n"
+    "1. words, word_meanings, word_sentences는 반드시 같은 개수여야 함 (한 문장 당 2단어)\n"
+    "2. words는 외국어 단어, word_meanings는 한국어 뜻\n"
+    "3. word_sentences는 해당 단어가 실제로 나온 기사 원문 문장 (그대로 옮길 것)\n"
+    "4. 해당 언어의 관사, 접속사, 대명사, 고유명사(사람 이름, 나라명 등)는 제외(중요)\n"
+    "5. 배열 개수를 반드시 확인하고 정확히 맞춰서 출력"
+)
+
+@st.cache_resource
+def get_prompts():
+    """(문장·번역 프롬프트, 단어장 프롬프트)를 한 번만 만들어 반환"""
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    sentences_prompt = ChatPromptTemplate.from_messages([
+        ("system", SENTENCES_RULES),
+        ("human", "텍스트:\n{text}"),
+    ])
+    
+    vocab_prompt = ChatPromptTemplate.from_messages([
+        ("system", VOCAB_RULES),
+        ("human", "텍스트:\n{text}"),
+    ])
+    return sentences_prompt, vocab_prompt
+
 # ====== 난이도 계산 함수 ======
-def calculate_difficulty(sentences):
-    """문장 리스트를 기반으로 난이도를 A1~C2로 계산"""
-    if not sentences:
-        return "A1"
+DIFFICULTY_LEVELS = ("A1", "A2", "B1", "B2", "C1", "C2")
+AVG_LENGTH_THRESHOLDS = np.array([10, 15, 20, 25, 30])  # 단계별 평균 문장 길이 상한
+COMPLEX_RATIO_THRESHOLDS = np.array([0.1, 0.15, 0.2, 0.25, 0.3])  # 단계별 복잡 단어 비율 상한
+
+def sentence_stats(sentences):
+    """문장별 단어 수와 복잡 단어(8자 이상) 수를 병렬 배열로 계산"""
+    tokenized = [sentence.split() for sentence in sentences]
+    word_counts = np.fromiter(map(len, tokenized), dtype=np.int32, count=len(tokenized))
     
-    total_words = 0
-    complex_words = 0
+    # 모든 단어 길이를 한 번에 배열로 모은 뒤, 누적합 차이로 문장별 복잡 단어 수 집계
+    word_lengths = np.fromiter(
+        (len(w) for words in tokenized for w in words),
+        dtype=np.int32,
+        count=int(word_counts.sum())
+    )
+    boundaries = np.concatenate(([0], np.cumsum(word_counts)))
+    complex_cumsum = np.concatenate(([0], np.cumsum(word_lengths > 7)))
+    complex_counts = (complex_cumsum[boundaries[1:]] - complex_cumsum[boundaries[:-1]]).astype(np.int32)
+    return word_counts, complex_counts
+
+def calculate_difficulty(word_counts, complex_counts):
+    """문장별 단어 수·복잡 단어 수 배열을 기반으로 난이도를 A1~C2로 계산"""
+    if word_counts.size == 0:
+        return "A1"
     
-    for sentence in sentences:
-        words = sentence.split()
-        total_words += len(words)
-        complex_words += len([w for w in words if len(w) > 7])
+    total_words = word_counts.sum()
     
     if total_words == 0:
         return "A1"
     
-    avg_sentence_length = total_words / len(sentences)
-    complex_ratio = complex_words / total_words
+    avg_sentence_length = word_counts.mean()
+    complex_ratio = complex_counts.sum() / total_words
     
-    # 난이도 계산 로직
-    if avg_sentence_length < 10 and complex_ratio < 0.1:
-        return "A1"
-    elif avg_sentence_length < 15 and complex_ratio < 0.15:
-        return "A2"
-    elif avg_sentence_length < 20 and complex_ratio < 0.2:
-        return "B1"
-    elif avg_sentence_length < 25 and complex_ratio < 0.25:
-        return "B2"
-    elif avg_sentence_length < 30 and complex_ratio < 0.3:
-        return "C1"
-    else:
-        return "C2"
+    # 두 기준을 모두 만족하는 가장 낮은 단계 선택 (상한을 넘으면 C2)
+    level = max(
+        np.searchsorted(AVG_LENGTH_THRESHOLDS, avg_sentence_length, side='right'),
+        np.searchsorted(COMPLEX_RATIO_THRESHOLDS, complex_ratio, side='right')
+    )
+    return DIFFICULTY_LEVELS[level]
+
+# ====== 한글 폰트 등록 함수 ======
+@st.cache_resource
+def _register_korean_font():
+    """한글 폰트를 프로세스당 한 번만 찾아 등록하고 폰트 이름 반환 (실패 시 None)"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    
+    # Windows 시스템 폰트 경로들
+    font_paths = [
+        "C:/Windows/Fonts/malgun.ttf",  # 맑은 고딕
+        "C:/Windows/Fonts/gulim.ttc",   # 굴림
+        "C:/Windows/Fonts/batang.ttc",  # 바탕
+        "/System/Library/Fonts/AppleSDGothicNeo.ttc",  # macOS
+        "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",  # Linux
+    ]
+    
+    # 느린 파일시스템(NFS 등)에서도 지연이 쌓이지 않도록 경로 존재 여부를 동시에 확인
+    with ThreadPoolExecutor(max_workers=len(font_paths)) as executor:
+        exists = list(executor.map(os.path.exists, font_paths))
+    
+    # 우선순위 순서대로 존재하는 첫 폰트 등록
+    for font_path, found in zip(font_paths, exists):
+        if found:
+            try:
+                pdfmetrics.registerFont(TTFont('Korean', font_path))
+                return 'Korean'
+            except Exception:
+                continue
+    return None
+
+# ====== PDF 스타일 ======
+@st.cache_resource
+def _pdf_styles(font_name):
+    """폰트별 (제목, 소제목, 본문) 스타일을 한 번만 만들어 반환 (font_name이 None이면 기본 스타일)"""
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    
+    styles = getSampleStyleSheet()
+    
+    if not font_name:
+        # 폰트 등록 실패 시 기본 스타일 사용
+        return styles['Title'], styles['Heading2'], styles['Normal']
+    
+    # 한글 폰트가 등록된 경우
+    korean_title = ParagraphStyle(
+        'KoreanTitle',
+        parent=styles['Title'],
+        fontName=font_name,
+        fontSize=16,
+        spaceAfter=20
+    )
+    
+    korean_heading = ParagraphStyle(
+        'KoreanHeading',
+        parent=styles['Heading2'],
+        fontName=font_name,
+        fontSize=12,
+        spaceAfter=10
+    )
+    
+    korean_normal = ParagraphStyle(
+        'KoreanNormal',
+        parent=styles['Normal'],
+        fontName=font_name,
+        fontSize=10,
+        spaceAfter=8
+    )
+    return korean_title, korean_heading, korean_normal
 
 # ====== PDF 생성 함수 ======
 def create_pdf(sentences, translations, topic):
     """문장과 번역을 PDF로 생성 (한글 폰트 지원)"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, KeepTogether
     
-    # 한글 폰트 등록 시도
+    buffer = io.BytesIO()
+    doc = BaseDocTemplate(buffer, pagesize=A4, pageCompression=1)  # 페이지 내용 압축으로 파일 크기 절감
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='body')
+    doc.addPageTemplates([PageTemplate(id='page', frames=[frame])])
+    
+    # 한글 폰트 등록과 스타일 생성은 최초 1회만 실행되고 이후에는 캐시된 결과 사용
     try:
-        # Windows 시스템 폰트 경로들
-        font_paths = [
-            "C:/Windows/Fonts/malgun.ttf",  # 맑은 고딕
-            "C:/Windows/Fonts/gulim.ttc",   # 굴림
-            "C:/Windows/Fonts/batang.ttc",  # 바탕
-            "/System/Library/Fonts/AppleSDGothicNeo.ttc",  # macOS
-            "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",  # Linux
-        ]
-        
-        font_registered = False
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    pdfmetrics.registerFont(TTFont('Korean', font_path))
-                    font_registered = True
-                    break
-                except:
-                    continue
-        
-        # 스타일 설정
-        styles = getSampleStyleSheet()
-        
-        if font_registered:
-            # 한글 폰트가 등록된 경우
-            from reportlab.lib.styles import ParagraphStyle
-            
-            korean_title = ParagraphStyle(
-                'KoreanTitle',
-                parent=styles['Title'],
-                fontName='Korean',
-                fontSize=16,
-                spaceAfter=20
-            )
-            
-            korean_heading = ParagraphStyle(
-                'KoreanHeading',
-                parent=styles['Heading2'],
-                fontName='Korean',
-                fontSize=12,
-                spaceAfter=10
-            )
-            
-            korean_normal = ParagraphStyle(
-                'KoreanNormal',
-                parent=styles['Normal'],
-                fontName='Korean',
-                fontSize=10,
-                spaceAfter=8
-            )
-        else:
-            # 폰트 등록 실패 시 기본 스타일 사용
-            korean_title = styles['Title']
-            korean_heading = styles['Heading2']
-            korean_normal = styles['Normal']
-            
+        korean_title, korean_heading, korean_normal = _pdf_styles(_register_korean_font())
     except Exception as e:
         # 오류 발생 시 기본 스타일 사용
-        styles = getSampleStyleSheet()
-        korean_title = styles['Title']
-        korean_heading = styles['Heading2']
-        korean_normal = styles['Normal']
+        korean_title, korean_heading, korean_normal = _pdf_styles(None)
     
     story = []
     
@@ -201,156 +290,443 @@ def create_pdf(sentences, translations, topic):
     story.append(title)
     story.append(Spacer(1, 20))
     
-    # 문장과 번역 추가
+    # 문장과 번역 추가 (문장 번호·원문·번역을 한 묶음으로 배치해 페이지 사이에서 갈라지지 않게 함)
     for i, (sentence, translation) in enumerate(zip(sentences, translations), 1):
-        # 문장 번호
-        story.append(Paragraph(f"<b>문장 {i}:</b>", korean_heading))
-        # 원문
-        story.append(Paragraph(f"<b>원문:</b> {sentence}", korean_normal))
-        # 번역
-        story.append(Paragraph(f"<b>번역:</b> {translation}", korean_normal))
+        story.append(KeepTogether([
+            # 문장 번호
+            Paragraph(f"<b>문장 {i}:</b>", korean_heading),
+            # 원문
+            Paragraph(f"<b>원문:</b> {sentence}", korean_normal),
+            # 번역
+            Paragraph(f"<b>번역:</b> {translation}", korean_normal),
+        ]))
         story.append(Spacer(1, 15))
     
     doc.build(story)
     buffer.seek(0)
     return buffer
 
-# ====== Session State 초기화 ======
-if 'analysis_data' not in st.session_state:
-    st.session_state.analysis_data = None
-if 'current_url' not in st.session_state:
-    st.session_state.current_url = ""
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def create_pdf_bytes(topic, sentences, translations):
+    """PDF 바이트 생성 (같은 분석 결과는 재실행마다 다시 만들지 않도록 캐시)"""
+    return create_pdf(list(sentences), list(translations), topic).getvalue()
 
-# ====== UI 구성 ======
-url_input = st.text_input("기사 URL을 입력하세요:", value=st.session_state.current_url)
+# ====== CSV 생성 함수 ======
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def create_csv(words, word_meanings, word_sentences):
+    """단어장을 CSV 바이트로 생성 (Excel에서 한글이 깨지지 않도록 UTF-8 BOM 포함)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['단어', '뜻', '예문'])
+    writer.writerows(zip(words, word_meanings, word_sentences))
+    return buffer.getvalue().encode('utf-8-sig')
 
-if st.button("기사 분석 시작"):
-    if not url_input:
-        st.warning("URL을 입력하세요!")
-    else:
-        # 1️⃣ 기사 크롤링
-        loader = WebBaseLoader(url_input)
-        docs = loader.load()
-        text = docs[0].page_content
-
-        # 2️⃣ 한 번의 API 호출로 모든 데이터 추출
-        analysis_prompt = PromptTemplate(
-            input_variables=["text"],
-            template=(
-                "다음 텍스트에서 뉴스 기사 본문만 찾아서 분석해줘. "
-                "광고, 메뉴, 댓글, 관련기사 목록, 사이트 네비게이션 등은 무시하고 실제 뉴스 내용만 처리해줘.\n\n"
-                
-                "결과를 반드시 다음 JSON 형식으로만 출력해줘:\n"
-                "{{\n"
-                '  "topic": "기사 주제 (한국어 20자 이내)",\n'
-                '  "sentences": ["외국어 문장1", "외국어 문장2", "외국어 문장3", ...],\n'
-                '  "translations": ["한국어 번역1", "한국어 번역2", "한국어 번역3", ...],\n'
-                '  "words": ["외국어단어1", "외국어단어2", "외국어단어3", ...],\n'
-                '  "word_meanings": ["한국어뜻1", "한국어뜻2", "한국어뜻3", ...],\n'
-                '  "word_sentences": ["해당 단어가 나온 문장1", "해당 단어가 나온 문장2", "해당 단어가 나온 문장3", ...]\n'
-                "}}\n\n"
-                
-                "중요한 규칙:\n"
-                "1. sentences와 translations는 반드시 같은 개수여야 함\n"
-                "2. words, word_meanings, word_sentences는 반드시 같은 개수여야 함 (한 문장 당 2단어)\n"
-                "3. sentences는 외국어 원문, translations는 한국어 번역\n"
-                "4. words는 외국어 단어, word_meanings는 한국어 뜻\n"
-                "5. word_sentences는 해당 단어가 실제로 나온 문장 (sentences 배열에서 가져온 것)\n"
-                "6. 해당 언어의 관사, 접속사, 대명사, 고유명사(사람 이름, 나라명 등)는 제외(중요)\n"
-                "7. 배열 개수를 반드시 확인하고 정확히 맞춰서 출력\n\n"
-                
-                "텍스트:\n{text}"
+# ====== 분석 결과 데이터 ======
+@dataclass(slots=True)
+class Analysis:
+    """기사 하나의 분석 결과 (세션 상태와 캐시에 저장)"""
+    topic: str
+    sentences: list
+    translations: list
+    words: list
+    word_meanings: list
+    word_sentences: list
+    word_counts: np.ndarray  # 문장별 단어 수
+    complex_counts: np.ndarray  # 문장별 복잡 단어 수
+    difficulty_level: str
+
+# ====== 분석 결과 캐시 ======
+@st.cache_resource
+def _analysis_cache():
+    """재실행·세션 간에 공유되는 LRU 분석 결과 캐시 {키: (저장 시각, 결과)}"""
+    return OrderedDict()
+
+@st.cache_resource
+def _analysis_cache_lock():
+    """여러 세션이 동시에 캐시를 수정하지 않도록 보호하는 잠금"""
+    return threading.Lock()
+
+def cache_key(model, text):
+    """모델명과 정리된 기사 본문으로 SHA-256 캐시 키 생성"""
+    cleaned = " ".join(text.split())  # 공백 차이만 있는 동일 기사도 같은 키로 처리
+    payload = json.dumps({"model": model, "text": cleaned}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def url_cache_key(model, url):
+    """모델명과 기사 URL로 캐시 키 생성 (크롤링 전에 확인 가능)"""
+    return f"url:{model}:{url}"
+
+def cache_get(key, ttl=CACHE_TTL_SECONDS):
+    """캐시된 분석 결과 반환 (없거나 만료되면 None)"""
+    cache = _analysis_cache()
+    with _analysis_cache_lock():
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        saved_at, value = entry
+        if time.time() - saved_at > ttl:
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+    return value
+
+def cache_set(key, value):
+    """분석 결과를 캐시에 저장"""
+    cache = _analysis_cache()
+    with _analysis_cache_lock():
+        cache[key] = (time.time(), value)
+        cache.move_to_end(key)
+        while len(cache) > CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+
+# ====== 기사 크롤링 함수 ======
+def fetch_articles(urls):
+    """여러 기사 URL을 비동기(aiohttp)로 동시에 가져와 본문 텍스트 리스트 반환"""
+    from langchain_community.document_loaders import WebBaseLoader
+    
+    # continue_on_failure: 죽은 링크·DNS 오류 등 실패한 URL은 빈 페이지로 받아 나머지 기사는 계속 처리
+    # (빈 본문은 analyze_urls에서 URL별 경고와 함께 건너뜀)
+    loader = WebBaseLoader(urls, requests_per_second=CRAWL_CONCURRENCY, continue_on_failure=True)
+    # scrape_all은 동시 요청 수를 requests_per_second로 제한하며 한 번에 가져옴
+    soups = loader.scrape_all(urls)
+    texts = [extract_article_text(soup) for soup in soups]
+    
+    # aiohttp는 Content-Type 헤더에 charset이 없으면 UTF-8로 디코딩해, meta 태그에만 인코딩을
+    # 선언한 페이지(EUC-KR 등)는 빈 페이지가 됨 → 비어 있는 URL만 requests 경로로 다시 가져옴
+    return [
+        text if text.strip() else refetch_article_text(url)
+        for url, text in zip(urls, texts)
+    ]
+
+def refetch_article_text(url):
+    """requests로 기사를 다시 가져와 본문 텍스트 반환 (실패 시 빈 문자열)"""
+    from langchain_community.document_loaders import WebBaseLoader
+    
+    # 동기 경로는 응답 본문으로 인코딩을 추정(apparent_encoding)하므로 meta 태그 charset 페이지도 디코딩됨
+    try:
+        return extract_article_text(WebBaseLoader(url).scrape())
+    except Exception:
+        return ""
+
+# 기사 본문이 아닌 영역 (스크립트, 메뉴, 꼬리말, 사이드바 등)
+# form은 제외: ASP.NET WebForms 사이트는 <body> 전체가 하나의 <form> 안에 있음
+BOILERPLATE_TAGS = ["script", "style", "noscript", "iframe", "svg", "nav", "footer", "aside"]
+
+# 줄바꿈 기준이 되는 블록 요소 (문단, 목록 항목, 제목, 표 셀 등)
+BLOCK_TAGS = [
+    "p", "div", "br", "li", "ul", "ol", "dl", "dt", "dd", "h1", "h2", "h3", "h4", "h5", "h6",
+    "table", "tr", "td", "th", "section", "article", "header", "blockquote", "pre", "figcaption",
+]
+
+def extract_article_text(soup):
+    """HTML에서 본문이 아닌 영역을 걷어내고, 빈 줄을 정리한 뒤 최대 길이로 자른 텍스트 반환"""
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    
+    # 사이트 머리말만 제거 (<article> 안의 header는 기사 제목·요약이므로 유지)
+    for header in soup("header"):
+        if header.find_parent("article") is None:
+            header.decompose()
+    
+    # 줄바꿈은 블록 요소 경계에만 넣고 인라인 요소(a, b, span 등)는 문장 안에 이어 붙임
+    for tag in soup(BLOCK_TAGS):
+        tag.insert_before("\n")
+        tag.insert_after("\n")
+    
+    # 줄마다 연속 공백을 하나로 줄이고 빈 줄 제거
+    lines = (" ".join(line.split()) for line in soup.get_text().splitlines())
+    text = "\n".join(line for line in lines if line)
+    return text[:MAX_ARTICLE_CHARS]
+
+# ====== 기사 분석 함수 ======
+def analyze_texts(texts, urls):
+    """여러 기사 본문을 한 번의 배치 호출로 분석해 결과 리스트 반환 (urls는 메시지에 표시할 기사 출처)"""
+    sentences_prompt, vocab_prompt = get_prompts()
+    sentences_chain = sentences_prompt | llm
+    vocab_chain = vocab_prompt | llm
+    
+    # 기사가 하나면 문장·번역 응답을 스트리밍으로 받아 문장을 바로바로 보여줌
+    if len(texts) == 1:
+        sentences_result, vocab_result = asyncio.run(
+            analyze_single(sentences_chain, vocab_chain, texts[0])
+        )
+        return [parse_responses(sentences_result, vocab_result, urls[0])]
+    
+    # 모든 기사의 두 프롬프트를 한데 모아 비동기 배치로 요청 (동시 요청 수는 LLM_CONCURRENCY로 제한)
+    # return_exceptions: 일부 요청이 실패(429, 안전 차단, 시간 초과 등)해도 나머지 기사 결과는 유지
+    inputs = [{"text": text} for text in texts]
+    prompts = [sentences_prompt.invoke(x) for x in inputs] + [vocab_prompt.invoke(x) for x in inputs]
+    
+    with st.spinner(f"기사 {len(texts)}개를 분석 중... (잠시만 기다려주세요)"):
+        responses = asyncio.run(
+            llm.abatch(
+                prompts,
+                config={"max_concurrency": LLM_CONCURRENCY},
+                return_exceptions=True
             )
         )
+    
+    sentences_responses, vocab_responses = responses[:len(texts)], responses[len(texts):]
+    return [
+        parse_responses(response_text(sentences_response), response_text(vocab_response), url)
+        for sentences_response, vocab_response, url in zip(sentences_responses, vocab_responses, urls)
+    ]
+
+def response_text(response):
+    """LLM 응답 메시지의 텍스트 반환 (요청이 실패해 예외가 담긴 경우 예외를 그대로 반환)"""
+    return response if isinstance(response, Exception) else response.content
+
+def parse_responses(sentences_result, vocab_result, url):
+    """두 응답 중 하나라도 요청이 실패했으면 오류를 표시하고 None, 아니면 parse_analysis 결과 반환"""
+    for result in (sentences_result, vocab_result):
+        if isinstance(result, Exception):
+            st.error(f"❌ {url}: 기사 분석 요청 중 오류가 발생했습니다: {str(result)}")
+            return None
+    return parse_analysis(sentences_result, vocab_result, url)
+
+_SENTENCES_START_RE = re.compile(r'"sentences"\s*:\s*\[')
+_JSON_ITEM_RE = re.compile(r'\s*"((?:[^"\\]|\\.)*)"\s*,?')
+
+def streamed_sentences(partial):
+    """스트리밍 중인 JSON 문자열에서 지금까지 완성된 sentences 항목만 추출"""
+    start = _SENTENCES_START_RE.search(partial)
+    if not start:
+        return []
+    
+    sentences = []
+    pos = start.end()
+    while (match := _JSON_ITEM_RE.match(partial, pos)):
+        try:
+            sentences.append(json.loads(f'"{match.group(1)}"'))
+        except json.JSONDecodeError:
+            break
+        pos = match.end()
+    return sentences
+
+async def stream_sentences(chain, text):
+    """문장·번역 응답을 스트리밍으로 받으며 완성된 문장을 미리 보여주고, 전체 응답 문자열 반환"""
+    preview = st.empty()
+    chunks = []
+    shown = 0
+    
+    try:
+        async for chunk in chain.astream({"text": text}):
+            chunks.append(chunk.content)
+            sentences = streamed_sentences("".join(chunks))
+            if len(sentences) > shown:
+                shown = len(sentences)
+                preview.markdown(
+                    f"**📖 받은 문장 {shown}개**\n\n" +
+                    "\n".join(f"{i}. {sentence}" for i, sentence in enumerate(sentences, 1))
+                )
+    finally:
+        preview.empty()
+    return "".join(chunks)
+
+async def analyze_single(sentences_chain, vocab_chain, text):
+    """문장·번역은 스트리밍으로 받고, 그동안 단어장 요청을 동시에 보내 두 응답 문자열 반환 (실패한 쪽은 예외)"""
+    with st.spinner("기사를 분석 중... (잠시만 기다려주세요)"):
+        sentences_result, vocab_message = await asyncio.gather(
+            stream_sentences(sentences_chain, text),
+            vocab_chain.ainvoke({"text": text}),
+            return_exceptions=True
+        )
+    # return_exceptions는 요청 실패(Exception)만 결과로 돌려받기 위한 것:
+    # Streamlit의 중지·재실행 신호(StopException/RerunException, BaseException)는 그대로 전파
+    for result in (sentences_result, vocab_message):
+        if isinstance(result, BaseException) and not isinstance(result, Exception):
+            raise result
+    return sentences_result, response_text(vocab_message)
+
+_JSON_DECODER = json.JSONDecoder()
+
+def extract_json(result):
+    """LLM 응답 문자열에서 JSON 부분만 찾아 파싱"""
+    # ```json 태그가 있으면 그 뒤의 첫 '{'부터, 없으면 응답의 첫 '{'부터 시작해
+    # 객체가 끝나는 곳까지 한 번만 훑으며 파싱 (앞뒤 설명 텍스트 무시)
+    fence = result.find("```json")
+    start = result.find("{", fence + len("```json") if fence != -1 else 0)
+    if start == -1:
+        return json.loads(result)
+    data, _ = _JSON_DECODER.raw_decode(result, start)
+    return data
+
+def parse_analysis(sentences_result, vocab_result, url):
+    """문장·번역 응답과 단어장 응답을 합쳐 Analysis 반환 (실패 시 None, url은 메시지에 표시할 기사 출처)"""
+    result = f"{sentences_result}\n\n{vocab_result}"  # 오류 시 보여줄 원본 결과
+    try:
+        # JSON 파싱
+        data = {**extract_json(sentences_result), **extract_json(vocab_result)}
         
-        chain = LLMChain(llm=llm, prompt=analysis_prompt)
-        
-        with st.spinner("기사를 분석 중... (잠시만 기다려주세요)"):
-            result = chain.run(text)
+        # 데이터 추출
+        topic = data.get("topic", "주제 없음")
+        sentences = data.get("sentences", [])
+        translations = data.get("translations", [])
+        words = data.get("words", [])
+        word_meanings = data.get("word_meanings", [])
+        word_sentences = data.get("word_sentences", [])
         
-        try:
-            # JSON 파싱
-            # JSON 부분만 추출 (```json 태그 제거)
-            if "```json" in result:
-                json_start = result.find("```json") + 7
-                json_end = result.find("```", json_start)
-                json_str = result[json_start:json_end].strip()
-            elif "{" in result and "}" in result:
-                json_start = result.find("{")
-                json_end = result.rfind("}") + 1
-                json_str = result[json_start:json_end]
-            else:
-                json_str = result
+        # 배열 길이 검증 및 보정
+        if len(words) != len(word_meanings) or len(words) != len(word_sentences):
+            st.warning(f"⚠️ {url}: 단어 배열 길이 불일치 감지: 단어 {len(words)}개, 뜻 {len(word_meanings)}개, 문장 {len(word_sentences)}개")
             
-            data = json.loads(json_str)
+            # 가장 짧은 배열에 맞춰서 자르기
+            min_length = min(len(words), len(word_meanings), len(word_sentences))
+            words = words[:min_length]
+            word_meanings = word_meanings[:min_length]
+            word_sentences = word_sentences[:min_length]
             
-            # 데이터 추출
-            topic = data.get("topic", "주제 없음")
-            sentences = data.get("sentences", [])
-            translations = data.get("translations", [])
-            words = data.get("words", [])
-            word_meanings = data.get("word_meanings", [])
-            word_sentences = data.get("word_sentences", [])
-            
-            # 배열 길이 검증 및 보정
-            if len(words) != len(word_meanings) or len(words) != len(word_sentences):
-                st.warning(f"⚠️ 단어 배열 길이 불일치 감지: 단어 {len(words)}개, 뜻 {len(word_meanings)}개, 문장 {len(word_sentences)}개")
-                
-                # 가장 짧은 배열에 맞춰서 자르기
-                min_length = min(len(words), len(word_meanings), len(word_sentences))
-                words = words[:min_length]
-                word_meanings = word_meanings[:min_length]
-                word_sentences = word_sentences[:min_length]
-                
-                st.info(f"✅ 배열 길이를 {min_length}개로 맞췄습니다.")
+            st.info(f"✅ {url}: 배열 길이를 {min_length}개로 맞췄습니다.")
+        
+        if len(sentences) != len(translations):
+            st.warning(f"⚠️ {url}: 문장 배열 길이 불일치 감지: 문장 {len(sentences)}개, 번역 {len(translations)}개")
             
-            if len(sentences) != len(translations):
-                st.warning(f"⚠️ 문장 배열 길이 불일치 감지: 문장 {len(sentences)}개, 번역 {len(translations)}개")
-                
-                # 더 짧은 배열에 맞춰서 자르기
-                min_length = min(len(sentences), len(translations))
-                sentences = sentences[:min_length]
-                translations = translations[:min_length]
-                
-                st.info(f"✅ 배열 길이를 {min_length}개로 맞췄습니다.")
+            # 더 짧은 배열에 맞춰서 자르기
+            min_length = min(len(sentences), len(translations))
+            sentences = sentences[:min_length]
+            translations = translations[:min_length]
             
+            st.info(f"✅ {url}: 배열 길이를 {min_length}개로 맞췄습니다.")
+        
+        # 문장별 통계는 한 번만 계산해 결과와 함께 저장 (난이도·통계 표시에 재사용)
+        word_counts, complex_counts = sentence_stats(sentences)
+        
+        return Analysis(
+            topic=topic,
+            sentences=sentences,
+            translations=translations,
+            words=words,
+            word_meanings=word_meanings,
+            word_sentences=word_sentences,
+            word_counts=word_counts,
+            complex_counts=complex_counts,
+            difficulty_level=calculate_difficulty(word_counts, complex_counts)
+        )
+        
+    except json.JSONDecodeError as e:
+        st.error(f"{url}: 결과 파싱 중 오류가 발생했습니다. 다시 시도해주세요.")
+        st.write("원본 결과:")
+        st.code(result)
+    except Exception as e:
+        st.error(f"{url}: 처리 중 오류가 발생했습니다: {str(e)}")
+        st.write("원본 결과:")
+        st.code(result)
+    return None
+
+def analyze_urls(urls):
+    """URL 캐시 → 크롤링 → 본문 캐시 → LLM 순으로 확인하며 기사 분석 결과 리스트 반환"""
+    # 최근에 분석한 URL은 크롤링 없이 저장된 결과 사용
+    url_keys = [url_cache_key(LLM_MODEL, url) for url in urls]
+    analyses = [cache_get(key, ttl=URL_CACHE_TTL_SECONDS) for key in url_keys]
+    pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+    missing = []
+    
+    if pending:
+        # 나머지 기사 크롤링 (여러 기사를 동시에 가져옴)
+        with st.spinner("기사를 가져오는 중..."):
+            texts = fetch_articles([urls[i] for i in pending])
+        
+        # 본문이 비었거나 너무 짧은 기사(JS 렌더링 페이지, 가져오기 실패 등)는 캐시·LLM 없이 건너뜀
+        # (빈 본문끼리 같은 캐시 키를 공유해 다른 기사의 결과가 나오는 것을 막음)
+        fetched = []
+        for i, text in zip(pending, texts):
+            if len(text.strip()) < MIN_ARTICLE_CHARS:
+                st.warning(f"⚠️ 기사 본문을 가져오지 못해 건너뜁니다: {urls[i]}")
+            else:
+                fetched.append((i, text))
+        pending = [i for i, _ in fetched]
+        texts = [text for _, text in fetched]
+        
+        # 본문 캐시 확인 후, 캐시에 없는 기사만 한 번의 배치 호출로 분석
+        text_keys = [cache_key(LLM_MODEL, text) for text in texts]
+        for i, key in zip(pending, text_keys):
+            analyses[i] = cache_get(key)
+        missing = [j for j, i in enumerate(pending) if analyses[i] is None]
+    
+    reused = sum(analysis is not None for analysis in analyses)
+    if reused:
+        st.info(f"⚡ 이전에 분석한 기사 {reused}개는 저장된 결과를 불러왔습니다.")
+    
+    if missing:
+        # 본문이 같은 기사는 한 번만 분석 {본문 키: 대표 기사 위치}
+        unique = {}
+        for j in missing:
+            unique.setdefault(text_keys[j], j)
+        new_analyses = analyze_texts(
+            [texts[j] for j in unique.values()],
+            [urls[pending[j]] for j in unique.values()]
+        )
+        analyzed = dict(zip(unique.keys(), new_analyses))
+        
+        for key, analysis in analyzed.items():
+            if analysis is not None:
+                cache_set(key, analysis)
+        for j in missing:
+            analyses[pending[j]] = analyzed[text_keys[j]]
+    
+    for i in pending:
+        if analyses[i] is not None:
+            cache_set(url_keys[i], analyses[i])
+    return analyses
+
+# ====== Session State 초기화 ======
+if 'analysis_results' not in st.session_state:
+    st.session_state.analysis_results = []
+if 'current_urls' not in st.session_state:
+    st.session_state.current_urls = ""
+
+# ====== UI 구성 ======
+urls_input = st.text_area(
+    f"기사 URL을 입력하세요 (한 줄에 하나씩, 최대 {MAX_URLS}개):",
+    value=st.session_state.current_urls
+)
+
+if st.button("기사 분석 시작"):
+    # 중복 URL은 한 번만 분석 (입력 순서 유지)
+    urls = list(dict.fromkeys(url.strip() for url in urls_input.splitlines() if url.strip()))
+    if not urls:
+        st.warning("URL을 입력하세요!")
+    else:
+        if len(urls) > MAX_URLS:
+            st.warning(f"⚠️ 한 번에 최대 {MAX_URLS}개까지 분석할 수 있어 앞의 {MAX_URLS}개만 분석합니다.")
+            urls = urls[:MAX_URLS]
+        
+        analyses = analyze_urls(urls)
+        
+        # 실패한 기사를 빼도 어느 URL의 결과인지 알 수 있도록 (URL, 분석 결과) 쌍으로 저장
+        results = [(url, analysis) for url, analysis in zip(urls, analyses) if analysis is not None]
+        if results:
             # Session State에 분석 결과 저장
-            st.session_state.analysis_data = {
-                'topic': topic,
-                'sentences': sentences,
-                'translations': translations,
-                'words': words,
-                'word_meanings': word_meanings,
-                'word_sentences': word_sentences,
-                'difficulty_level': calculate_difficulty(sentences)
-            }
-            st.session_state.current_url = url_input
-            
-        except json.JSONDecodeError as e:
-            st.error("결과 파싱 중 오류가 발생했습니다. 다시 시도해주세요.")
-            st.write("원본 결과:")
-            st.code(result)
-        except Exception as e:
-            st.error(f"처리 중 오류가 발생했습니다: {str(e)}")
-            st.write("원본 결과:")
-            st.code(result)
+            st.session_state.analysis_results = results
+            st.session_state.current_urls = "\n".join(urls)
 
 # ====== 분석 결과 표시 (Session State 사용) ======
-if st.session_state.analysis_data:
-    data = st.session_state.analysis_data
+if st.session_state.analysis_results:
+    results = st.session_state.analysis_results
+    
+    # 여러 기사를 분석한 경우 표시할 기사 선택
+    if len(results) > 1:
+        selected = st.selectbox(
+            "📰 결과를 볼 기사를 선택하세요:",
+            range(len(results)),
+            format_func=lambda i: f"{results[i][1].topic} ({results[i][0]})"
+        )
+    else:
+        selected = 0
+    data = results[selected][1]
     
     # 기사 주제 표시
-    st.info(f"📰 **기사 주제**: {data['topic']}")
+    st.info(f"📰 **기사 주제**: {data.topic}")
     
     # 통계 표시
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("📝 문장 수", f"{len(data['sentences'])}개")
+        st.metric("📝 문장 수", f"{len(data.sentences)}개")
     with col2:
-        st.metric("📚 단어 수", f"{len(data['words'])}개")
+        st.metric("📚 단어 수", f"{len(data.words)}개")
     with col3:
-        color = "🟢" if data['difficulty_level'] in ["A1", "A2"] else "🟡" if data['difficulty_level'] in ["B1", "B2"] else "🔴"
-        st.metric("🎯 난이도", f"{color} {data['difficulty_level']}")
+        color = "🟢" if data.difficulty_level in ["A1", "A2"] else "🟡" if data.difficulty_level in ["B1", "B2"] else "🔴"
+        st.metric("🎯 난이도", f"{color} {data.difficulty_level}")
     
     st.divider()
     
@@ -360,20 +736,20 @@ if st.session_state.analysis_data:
     with tab1:
         st.subheader("문장별 번역")
         
-        # 문장과 번역 표시
-        for i, (sentence, translation) in enumerate(zip(data['sentences'], data['translations']), 1):
-            st.write(f"**문장 {i}:**")
-            st.write(f"**원문:** {sentence}")
-            st.write(f"**번역:** {translation}")
-            st.write("---")
+        # 문장과 번역 표시 (문장마다 위젯을 만들지 않고 하나의 마크다운으로 한 번에 전송)
+        st.markdown("\n".join(
+            f"**문장 {i}:**\n\n**원문:** {sentence}\n\n**번역:** {translation}\n\n---\n"
+            for i, (sentence, translation) in enumerate(zip(data.sentences, data.translations), 1)
+        ))
         
         # PDF 다운로드 버튼
-        if data['sentences'] and data['translations']:
+        if data.sentences and data.translations:
             try:
-                pdf_buffer = create_pdf(data['sentences'], data['translations'], data['topic'])
                 st.download_button(
                     label="📄 문장별 번역 PDF 다운로드",
-                    data=pdf_buffer.getvalue(),
+                    data=create_pdf_bytes(
+                        data.topic, tuple(data.sentences), tuple(data.translations)
+                    ),
                     file_name=f"sentences_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
                     mime="application/pdf",
                     key="pdf_download"
@@ -385,32 +761,33 @@ if st.session_state.analysis_data:
         st.subheader("단어장")
         
         # 단어장 테이블 생성
-        if data['words'] and data['word_meanings'] and data['word_sentences']:
-            vocab_df = pd.DataFrame({
-                '단어': data['words'],
-                '뜻': data['word_meanings'],
-                '예문': data['word_sentences']
-            })
+        if data.words and data.word_meanings and data.word_sentences:
+            vocab_table = {
+                '단어': data.words,
+                '뜻': data.word_meanings,
+                '예문': data.word_sentences
+            }
             
             # 테이블 표시
-            st.dataframe(vocab_df, use_container_width=True)
+            st.dataframe(vocab_table, use_container_width=True)
             
-            # CSV 다운로드 버튼 (UTF-8 인코딩)
-            csv = vocab_df.to_csv(index=False, encoding='utf-8')
+            # CSV 다운로드 버튼 (UTF-8 BOM 인코딩)
             st.download_button(
                 label="📥 단어장 CSV 다운로드",
-                data=csv.encode('utf-8'),
+                data=create_csv(
+                    tuple(data.words), tuple(data.word_meanings), tuple(data.word_sentences)
+                ),
                 file_name=f"vocabulary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime='text/csv',
                 key="csv_download"
             )
             
-            st.success(f"✅ 총 {len(data['words'])}개의 단어를 추출했습니다!")
+            st.success(f"✅ 총 {len(data.words)}개의 단어를 추출했습니다!")
         else:
             st.warning("단어를 추출할 수 없습니다.")
     
     # 새 분석 버튼
     if st.button("🔄 새로운 기사 분석하기", type="secondary"):
-        st.session_state.analysis_data = None
-        st.session_state.current_url = ""
+        st.session_state.analysis_results = []
+        st.session_state.current_urls = ""
         st.rerun()
\ No newline at end of file